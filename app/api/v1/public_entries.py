@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
+from app.core.config import settings
 from app.schemas.entry import EntryPublicResponse
-from app.services.sanity import fetch_entries, fetch_entry_by_slug
+from app.services.entry_events import get_broker
+from app.services.sanity import SanityClient, fetch_entries, fetch_entry_by_slug, get_sanity_client
+from app.services.sanity_index import get_entry_index
 
 router = APIRouter(prefix="/entries", tags=["public:entries"])
 
@@ -11,14 +15,43 @@ router = APIRouter(prefix="/entries", tags=["public:entries"])
 @router.get("/", response_model=list[EntryPublicResponse])
 async def list_published_entries(
     category: str | None = Query(default=None, description="Filter by category slug"),
+    sanity: SanityClient = Depends(get_sanity_client),
 ) -> list[EntryPublicResponse]:
-    entries = await fetch_entries(category=category)
+    index = get_entry_index(sanity.tenant.name)
+    if index is not None:
+        entries = index.list_entries(category)
+    else:
+        entries = await fetch_entries(category=category, client=sanity)
     return [EntryPublicResponse(**entry) for entry in entries]
 
 
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_entry_events(
+    sanity: SanityClient = Depends(get_sanity_client),
+    last_event_id: str | None = Header(default=None),
+) -> StreamingResponse:
+    """Push `created`/`updated`/`deleted` events (slug and `_rev`) as published entries change."""
+    if not settings.sanity_live_index:
+        # Events come from the live index listener; without it the stream would never emit anything.
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Entry stream is disabled")
+    broker = get_broker(sanity.tenant.name)
+    return StreamingResponse(
+        broker.subscribe(last_event_id or None, heartbeat=settings.entries_stream_heartbeat_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{slug}", response_model=EntryPublicResponse)
-async def read_entry_by_slug(slug: str) -> EntryPublicResponse:
-    entry = await fetch_entry_by_slug(slug)
+async def read_entry_by_slug(
+    slug: str,
+    sanity: SanityClient = Depends(get_sanity_client),
+) -> EntryPublicResponse:
+    index = get_entry_index(sanity.tenant.name)
+    if index is not None:
+        entry = index.get(slug)
+    else:
+        entry = await fetch_entry_by_slug(slug, client=sanity)
     if entry is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entry not found")
     return EntryPublicResponse(**entry)
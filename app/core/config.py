@@ -2,11 +2,62 @@ from __future__ import annotations
 
 import secrets
 from functools import lru_cache
-from typing import Optional, List
+from typing import Any, Optional, List
 
-from pydantic import AnyHttpUrl, validator
+from pydantic import AnyHttpUrl, BaseModel, validator
 from pydantic_settings import BaseSettings
 
+
+class SanityTenant(BaseModel):
+    """Connection details for a single Sanity dataset served by this deployment."""
+
+    name: str
+    project_id: str
+    dataset: str
+    api_version: str
+    token: Optional[str] = None
+    use_cdn: bool = True
+    api_host: Optional[str] = None
+    hosts: list[str] = []
+    max_connections: int = 10
+    rate_limit_per_second: float = 0.0
+
+    @property
+    def base_url(self) -> str:
+        if self.api_host:
+            return self.api_host.rstrip("/")
+        return f"https://{self.project_id}.api.sanity.io"
+
+    @property
+    def cdn_url(self) -> str:
+        """Host for published reads: the Sanity CDN when enabled, otherwise the live API."""
+        if self.api_host or not self.use_cdn or self.token:
+            # The CDN does not serve authenticated requests, and a host override means a stand-in.
+            return self.base_url
+        return f"https://{self.project_id}.apicdn.sanity.io"
+
+    @property
+    def versioned_api(self) -> str:
+        return self.api_version if self.api_version.startswith("v") else f"v{self.api_version}"
+
+    @property
+    def dataset_url(self) -> str:
+        return f"{self.cdn_url}/{self.versioned_api}/data/query/{self.dataset}"
+
+    @property
+    def live_dataset_url(self) -> str:
+        """Uncached query endpoint, for reads that must observe a mutation that just happened."""
+        return f"{self.base_url}/{self.versioned_api}/data/query/{self.dataset}"
+
+    @property
+    def listen_url(self) -> str:
+        return f"{self.base_url}/{self.versioned_api}/data/listen/{self.dataset}"
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.project_id}:{self.dataset}:{self.name}"
+
+
 class Settings(BaseSettings):
     app_name: str = "Novarchism Backend"
     environment: str = "development"
@@ -18,6 +69,30 @@ class Settings(BaseSettings):
     sanity_api_version: str = "2023-05-03"
     sanity_token: Optional[str] = None
     sanity_use_cdn: bool = True
+    sanity_api_host: Optional[str] = None
+    sanity_tenants: dict[str, dict[str, Any]] = {}
+    sanity_tenant_header: str = "X-Sanity-Dataset"
+    sanity_max_connections: int = 10
+    sanity_rate_limit_per_second: float = 0.0
+    sanity_cache_ttl_seconds: float = 0.0
+    cache_backend: str = "memory"
+    cache_disk_path: str = "/tmp/novarch-cache"
+    cache_max_entries: int = 1024
+    cache_compress_min_bytes: int = 1024
+    sanity_live_index: bool = True
+    sanity_listen_idle_timeout_seconds: float = 120.0
+    sanity_listen_stale_after_seconds: float = 10.0
+
+    entries_stream_heartbeat_seconds: float = 15.0
+    entries_stream_history: int = 1000
+
+    redis_url: Optional[str] = None
+    rate_limit_enabled: bool = True
+    rate_limit_public_per_minute: int = 120
+    rate_limit_public_burst: Optional[int] = None
+    rate_limit_auth_per_minute: int = 10
+    rate_limit_auth_burst: Optional[int] = 5
+    rate_limit_forwarded_hops: int = 0
 
     jwt_secret_key: str = secrets.token_urlsafe(32)
     jwt_algorithm: str = "HS256"
@@ -38,13 +113,31 @@ class Settings(BaseSettings):
         return bool(self.database_url and self.database_url.strip())
 
     @property
-    def sanity_dataset_url(self) -> Optional[str]:
+    def sanity_default_tenant(self) -> str:
+        return self.sanity_dataset
+
+    @property
+    def sanity_tenant_configs(self) -> dict[str, SanityTenant]:
         """
-        Construct the Sanity API endpoint for dataset queries or return None if config is incomplete.
+        Resolve every configured tenant, filling unset fields from the top-level Sanity settings.
+        The default tenant (keyed by `sanity_dataset`) is always present.
         """
-        if not self.sanity_project_id or not self.sanity_dataset:
-            return None
-        return f"https://{self.sanity_project_id}.api.sanity.io/{self.sanity_api_version}/data/query/{self.sanity_dataset}"
+        defaults: dict[str, Any] = {
+            "project_id": self.sanity_project_id,
+            "dataset": self.sanity_dataset,
+            "api_version": self.sanity_api_version,
+            "token": self.sanity_token,
+            "use_cdn": self.sanity_use_cdn,
+            "api_host": self.sanity_api_host,
+            "max_connections": self.sanity_max_connections,
+            "rate_limit_per_second": self.sanity_rate_limit_per_second,
+        }
+        tenants = {self.sanity_default_tenant: SanityTenant(name=self.sanity_default_tenant, **defaults)}
+        for name, overrides in self.sanity_tenants.items():
+            # A tenant keyed by its dataset name only needs to override what differs.
+            config = {**defaults, "dataset": name, **overrides}
+            tenants[name] = SanityTenant(name=name, **config)
+        return tenants
 
 @lru_cache()
 def get_settings() -> Settings:
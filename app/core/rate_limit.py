@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Message = dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated_at = now
+
+    def consume(self, rate: float, burst: float, now: float, cost: float = 1.0) -> float:
+        """Refill, then take ``cost`` tokens. Returns 0 on success, otherwise seconds until enough tokens."""
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / rate
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    name: str
+    rate: float
+    burst: int
+
+    @classmethod
+    def per_minute(cls, name: str, requests: int, burst: int | None = None) -> RateLimitPolicy:
+        return cls(name=name, rate=requests / 60.0, burst=burst or requests)
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+    @classmethod
+    def from_tokens(cls, policy: RateLimitPolicy, allowed: bool, tokens: float) -> RateLimitResult:
+        retry_after = 0.0 if allowed else (1 - tokens) / policy.rate
+        return cls(
+            allowed=allowed,
+            limit=policy.burst,
+            remaining=max(int(tokens), 0),
+            reset_after=(policy.burst - tokens) / policy.rate,
+            retry_after=retry_after,
+        )
+
+
+class RateLimitBackend(Protocol):
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult: ...
+
+
+class MemoryRateLimitBackend:
+    """Per-process buckets. Once ``max_keys`` is reached the oldest bucket is dropped, which only ever resets a limit."""
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult:
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                del self._buckets[next(iter(self._buckets))]
+            bucket = self._buckets[key] = TokenBucket(policy.burst, now)
+        allowed = bucket.consume(policy.rate, policy.burst, now) == 0.0
+        return RateLimitResult.from_tokens(policy, allowed, bucket.tokens)
+
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets shared by every worker through Redis, updated atomically by a Lua script using the
+    server clock. Any client exposing an async ``eval(script, numkeys, *keys_and_args)`` works,
+    so tests can pass a local stand-in.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> RedisRateLimitBackend:
+        try:
+            from redis.asyncio import Redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Install the 'redis' extra to use a shared rate limit backend") from exc
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def hit(self, key: str, policy: RateLimitPolicy) -> RateLimitResult:
+        allowed, tokens = await self.client.eval(
+            TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, repr(policy.rate), str(policy.burst)
+        )
+        return RateLimitResult.from_tokens(policy, bool(int(allowed)), float(tokens))
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    path_prefix: str
+    policy: RateLimitPolicy
+    methods: frozenset[str] | None = None
+
+    def matches(self, path: str, method: str) -> bool:
+        return path.startswith(self.path_prefix) and (self.methods is None or method in self.methods)
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI token-bucket limiter. The first rule matching the request path and method picks
+    the policy; each (policy, client) pair gets its own bucket. Unmatched requests pass straight through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: list[RateLimitRule],
+        backend: RateLimitBackend,
+        forwarded_hops: int = 0,
+    ) -> None:
+        self.app = app
+        self.rules = tuple(rules)
+        self.backend = backend
+        self.forwarded_hops = forwarded_hops
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path, method = scope["path"], scope["method"]
+        rule = next((rule for rule in self.rules if rule.matches(path, method)), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{rule.policy.name}:{self._client_key(scope)}"
+        try:
+            result = await self.backend.hit(key, rule.policy)
+        except Exception:  # a broken shared backend should not take the API down
+            logger.exception("Rate limit backend failed; allowing request")
+            await self.app(scope, receive, send)
+            return
+
+        headers = [
+            (b"ratelimit-limit", str(result.limit).encode()),
+            (b"ratelimit-remaining", str(result.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(result.reset_after)).encode()),
+        ]
+        if not result.allowed:
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            headers += [
+                (b"retry-after", str(math.ceil(result.retry_after)).encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _client_key(self, scope: Scope) -> str:
+        if self.forwarded_hops > 0:
+            # Clients control the left of X-Forwarded-For; only the entries appended by our own
+            # proxies can be trusted, so count ``forwarded_hops`` in from the right.
+            addresses = [
+                address.strip()
+                for name, value in scope["headers"]
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            if addresses:
+                return addresses[-min(self.forwarded_hops, len(addresses))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+
+def default_rules(settings: Settings) -> list[RateLimitRule]:
+    prefix = settings.api_v1_prefix
+    rules = [
+        RateLimitRule(
+            path_prefix=f"{prefix}/auth/token",
+            methods=frozenset({"POST"}),
+            policy=RateLimitPolicy.per_minute("auth", settings.rate_limit_auth_per_minute, settings.rate_limit_auth_burst),
+        ),
+        RateLimitRule(
+            path_prefix=f"{prefix}/entries",
+            methods=frozenset({"GET", "HEAD"}),
+            policy=RateLimitPolicy.per_minute(
+                "public", settings.rate_limit_public_per_minute, settings.rate_limit_public_burst
+            ),
+        ),
+    ]
+    # A limit of zero disables the rule rather than blocking the route.
+    return [rule for rule in rules if rule.policy.rate > 0]
+
+
+def create_backend(settings: Settings) -> RateLimitBackend:
+    if settings.redis_url:
+        return RedisRateLimitBackend.from_url(settings.redis_url)
+    return MemoryRateLimitBackend()
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from fastapi import HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
+_engine: AsyncEngine | None = None
+_sessionmaker: sessionmaker | None = None
 
-def get_engine():
+
+def create_engine() -> AsyncEngine:
     if settings.database_url is None:
         raise RuntimeError("Database URL is not configured")
     connect_args: dict[str, object] | None = None
@@ -25,17 +28,34 @@ def get_engine():
     )
 
 
-try:
-    engine = get_engine()
-except RuntimeError:
-    engine = None
-    AsyncSessionLocal: sessionmaker | None = None
-else:
-    AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+def get_engine() -> AsyncEngine | None:
+    """Create the engine on first use so importing the app stays cheap. Returns None without a database."""
+    global _engine
+    if _engine is None and settings.has_database:
+        _engine = create_engine()
+    return _engine
+
+
+def get_sessionmaker() -> sessionmaker | None:
+    global _sessionmaker
+    if _sessionmaker is None:
+        engine = get_engine()
+        if engine is not None:
+            _sessionmaker = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    return _sessionmaker
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
 
 
 async def get_session() -> AsyncSession:
-    if AsyncSessionLocal is None:
+    session_factory = get_sessionmaker()
+    if session_factory is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not configured")
-    async with AsyncSessionLocal() as session:
+    async with session_factory() as session:
         yield session
@@ -7,23 +7,45 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.api.v1 import auth, admin_entries, public_entries
+from app.api.v1 import public_entries
 from app.core.config import settings
-from app.db.base import *  # noqa: F401,F403
-from app.db.base_class import Base
-from app.db.session import engine
+from app.core.rate_limit import RateLimitMiddleware, create_backend, default_rules
+from app.services.sanity import close_clients
+from app.services.sanity_index import start_live_indexes, stop_live_indexes
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if engine is not None:
-        async with engine.begin() as conn:
+    if settings.has_database:
+        # SQLAlchemy, the models and the engine (with its SSL context) are only loaded when a database is configured.
+        from app.db import base as _models  # noqa: F401
+        from app.db.base_class import Base
+        from app.db.session import get_engine
+
+        async with get_engine().begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    if settings.sanity_live_index:
+        start_live_indexes()
     yield
+    await stop_live_indexes()
+    await close_clients()
+    if settings.has_database:
+        from app.db.session import dispose_engine
+
+        await dispose_engine()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
+# Added before CORS so CORS wraps it and 429 responses still carry CORS headers.
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=default_rules(settings),
+        backend=create_backend(settings),
+        forwarded_hops=settings.rate_limit_forwarded_hops,
+    )
+
 if settings.cors_origins:
     app.add_middleware(
         CORSMiddleware,
@@ -31,12 +53,15 @@ if settings.cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"],
     )
 
 static_dir = Path(__file__).resolve().parent / "static" / "admin"
 app.mount("/admin", StaticFiles(directory=static_dir, html=True), name="admin")
 
-if engine is not None:
+if settings.has_database:
+    from app.api.v1 import admin_entries, auth
+
     app.include_router(auth.router, prefix=settings.api_v1_prefix)
     app.include_router(admin_entries.router, prefix=settings.api_v1_prefix)
 else:
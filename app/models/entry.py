@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import enum
 import uuid
 
 from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, String, Text, func
@@ -8,16 +7,7 @@ from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
-
-
-class EntryCategory(str, enum.Enum):
-    doctrine = "doctrine"
-    creed = "creed"
-    ritual = "ritual"
-    prayer = "prayer"
-    event = "event"
-    testimony = "testimony"
-    other = "other"
+from app.models.enums import EntryCategory
 
 
 class Entry(Base):
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import enum
+
+
+class EntryCategory(str, enum.Enum):
+    doctrine = "doctrine"
+    creed = "creed"
+    ritual = "ritual"
+    prayer = "prayer"
+    event = "event"
+    testimony = "testimony"
+    other = "other"
@@ -5,7 +5,7 @@ from datetime import datetime
 
 from pydantic import BaseModel, Field
 
-from app.models.entry import EntryCategory
+from app.models.enums import EntryCategory
 
 
 class EntryBase(BaseModel):
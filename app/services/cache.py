@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Protocol
+
+from app.core.config import settings
+
+_RAW = b"j"
+_COMPRESSED = b"z"
+
+
+def encode_value(value: Any, compress_min_bytes: int = 1024) -> bytes:
+    """Serialize to compact JSON, zlib-compressing payloads of at least ``compress_min_bytes``."""
+    raw = json.dumps(value, separators=(",", ":"), default=str).encode()
+    if compress_min_bytes >= 0 and len(raw) >= compress_min_bytes:
+        return _COMPRESSED + zlib.compress(raw, 6)
+    return _RAW + raw
+
+
+def decode_value(data: bytes) -> Any:
+    marker, payload = data[:1], data[1:]
+    if marker == _COMPRESSED:
+        payload = zlib.decompress(payload)
+    return json.loads(payload)
+
+
+class CacheBackend(Protocol):
+    """
+    Byte store for rendered responses. Entries live under a per-namespace generation:
+    callers read ``generation`` before computing a value and store it under that generation,
+    so a value computed across an ``invalidate`` is written where nobody reads it any more.
+    ``invalidate`` must be visible to every worker sharing the backend. Passing the same
+    ``generation`` from several workers is idempotent, so they can all react to one change
+    without emptying the cache once each.
+    """
+
+    async def generation(self, namespace: str) -> str: ...
+
+    async def get(self, namespace: str, generation: str, key: str) -> bytes | None: ...
+
+    async def set(self, namespace: str, generation: str, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def invalidate(self, namespace: str, generation: str | None = None) -> None: ...
+
+
+class MemoryCacheBackend:
+    """Per-process LRU cache."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._generations: dict[str, str] = {}
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, bytes]] = OrderedDict()
+
+    async def generation(self, namespace: str) -> str:
+        return self._generations.get(namespace, "0")
+
+    async def get(self, namespace: str, generation: str, key: str) -> bytes | None:
+        cache_key = (namespace, generation, key)
+        item = self._entries.get(cache_key)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return item[1]
+
+    async def set(self, namespace: str, generation: str, key: str, value: bytes, ttl: float) -> None:
+        if generation != await self.generation(namespace):
+            return
+        cache_key = (namespace, generation, key)
+        self._entries[cache_key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, namespace: str, generation: str | None = None) -> None:
+        if generation is not None and generation == self._generations.get(namespace):
+            return
+        self._generations[namespace] = generation or uuid.uuid4().hex
+        for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == namespace]:
+            del self._entries[cache_key]
+
+
+class DiskCacheBackend:
+    """
+    Files under a local directory, shared by every worker on the node through the OS page cache.
+    Each namespace has a generation file; invalidating writes a new generation so other workers
+    stop reading the old files as soon as they notice the generation file changed.
+    Entries are small and local, so reads and writes stay synchronous. Every ``sweep_every``
+    writes the current generation is swept in a worker thread: expired files are removed, then the oldest files
+    beyond ``max_entries``, so user-controlled keys cannot fill the disk.
+    """
+
+    _header = struct.Struct(">d")
+
+    def __init__(self, root: str | Path, max_entries: int = 1024, sweep_every: int = 64) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._generations: dict[str, tuple[int, str]] = {}
+
+    def _namespace_dir(self, namespace: str) -> Path:
+        return self.root / hashlib.sha1(namespace.encode()).hexdigest()
+
+    def _current_generation(self, namespace: str) -> str:
+        marker = self._namespace_dir(namespace) / "generation"
+        try:
+            mtime = marker.stat().st_mtime_ns
+        except FileNotFoundError:
+            return "0"
+        cached = self._generations.get(namespace)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, marker.read_text().strip() or "0")
+            self._generations[namespace] = cached
+        return cached[1]
+
+    def _path(self, namespace: str, generation: str, key: str) -> Path:
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self._namespace_dir(namespace) / generation / digest
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def generation(self, namespace: str) -> str:
+        return self._current_generation(namespace)
+
+    async def get(self, namespace: str, generation: str, key: str) -> bytes | None:
+        try:
+            data = self._path(namespace, generation, key).read_bytes()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = self._header.unpack_from(data)
+        if expires_at <= time.time():
+            return None
+        return data[self._header.size:]
+
+    async def set(self, namespace: str, generation: str, key: str, value: bytes, ttl: float) -> None:
+        if generation != self._current_generation(namespace):
+            return
+        path = self._path(namespace, generation, key)
+        self._write_atomic(path, self._header.pack(time.time() + ttl) + value)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            await asyncio.to_thread(self._sweep, path.parent)
+
+    def _sweep(self, directory: Path) -> None:
+        now = time.time()
+        live: list[tuple[float, Path]] = []
+        try:
+            paths = list(directory.iterdir())
+        except FileNotFoundError:  # an invalidation removed the generation meanwhile
+            return
+        for path in paths:
+            if path.name.startswith("tmp"):
+                continue
+            try:
+                with path.open("rb") as handle:
+                    (expires_at,) = self._header.unpack(handle.read(self._header.size))
+                mtime = path.stat().st_mtime
+            except (OSError, struct.error):
+                continue
+            if expires_at <= now:
+                path.unlink(missing_ok=True)
+            else:
+                live.append((mtime, path))
+        live.sort()
+        for _, path in live[: max(len(live) - self.max_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+    async def invalidate(self, namespace: str, generation: str | None = None) -> None:
+        namespace_dir = self._namespace_dir(namespace)
+        if generation is not None and generation == self._current_generation(namespace):
+            return
+        generation = generation or uuid.uuid4().hex
+        self._write_atomic(namespace_dir / "generation", generation.encode())
+        # Drop older generations; a concurrent reader losing a file just sees a miss.
+        for child in namespace_dir.iterdir():
+            if child.is_dir() and child.name != generation:
+                shutil.rmtree(child, ignore_errors=True)
+
+
+class RedisCacheBackend:
+    """
+    Network key-value backend. Keys embed a per-namespace generation that invalidation replaces,
+    so every worker on every node switches to fresh keys. Workers re-read the
+    generation at most every ``generation_ttl`` seconds. Any client with async ``get``,
+    ``set(..., ex=...)`` works, so tests can pass a local stand-in.
+    """
+
+    def __init__(self, client: Any, prefix: str = "cache:", generation_ttl: float = 1.0) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.generation_ttl = generation_ttl
+        self._generations: dict[str, tuple[float, str]] = {}
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> RedisCacheBackend:
+        try:
+            from redis.asyncio import Redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("Install the 'redis' extra to use the redis cache backend") from exc
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def generation(self, namespace: str) -> str:
+        cached = self._generations.get(namespace)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = await self.client.get(f"{self.prefix}{namespace}:generation")
+        generation = value.decode() if isinstance(value, bytes) else str(value or 0)
+        self._generations[namespace] = (now + self.generation_ttl, generation)
+        return generation
+
+    def _key(self, namespace: str, generation: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{generation}:{key}"
+
+    async def get(self, namespace: str, generation: str, key: str) -> bytes | None:
+        return await self.client.get(self._key(namespace, generation, key))
+
+    async def set(self, namespace: str, generation: str, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self._key(namespace, generation, key), value, ex=max(int(ttl), 1))
+
+    async def invalidate(self, namespace: str, generation: str | None = None) -> None:
+        generation = generation or uuid.uuid4().hex
+        await self.client.set(f"{self.prefix}{namespace}:generation", generation)
+        self._generations[namespace] = (time.monotonic() + self.generation_ttl, generation)
+
+
+@lru_cache()
+def get_cache_backend() -> CacheBackend | None:
+    if settings.sanity_cache_ttl_seconds <= 0 or settings.cache_backend == "none":
+        return None
+    if settings.cache_backend == "disk":
+        return DiskCacheBackend(settings.cache_disk_path, max_entries=settings.cache_max_entries)
+    if settings.cache_backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("REDIS_URL is required for the redis cache backend")
+        return RedisCacheBackend.from_url(settings.redis_url)
+    if settings.cache_backend == "memory":
+        return MemoryCacheBackend(max_entries=settings.cache_max_entries)
+    raise RuntimeError(
+        f"Unknown CACHE_BACKEND {settings.cache_backend!r}; expected memory, disk, redis or none"
+    )
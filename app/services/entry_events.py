@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.services.sse import ServerSentEvent
+
+HEARTBEAT = ": ping\n\n"
+
+
+@dataclass(frozen=True)
+class EntryEvent:
+    id: int
+    type: str
+    slug: str | None
+    rev: str | None
+
+    def to_sse(self, epoch: str) -> ServerSentEvent:
+        data = json.dumps({'slug': self.slug, '_rev': self.rev}, separators=(',', ':'))
+        return ServerSentEvent(event=self.type, data=data, id=f'{epoch}:{self.id}')
+
+
+class EntryEventBroker:
+    """
+    Fans entry change events out to stream subscribers. Subscribers share a single asyncio.Event
+    that is swapped on every publish and read from a bounded history, so idle connections cost
+    one pending waiter each rather than a queue.
+
+    Event ids are ``<epoch>:<n>``, where the epoch is unique to this broker instance, so ids
+    from another worker or an earlier process are recognised and answered with ``resync``.
+    """
+
+    def __init__(self, history: int = 1000) -> None:
+        self.epoch = uuid.uuid4().hex
+        self._events: deque[EntryEvent] = deque(maxlen=history)
+        self._last_id = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, type: str, slug: str | None, rev: str | None) -> EntryEvent:
+        self._last_id += 1
+        event = EntryEvent(id=self._last_id, type=type, slug=slug, rev=rev)
+        self._events.append(event)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return event
+
+    def since(self, last_id: int) -> list[EntryEvent] | None:
+        """Events newer than ``last_id``, or None when some of them have fallen out of the history."""
+        if last_id >= self._last_id:
+            return []
+        if not self._events or last_id < self._events[0].id - 1:
+            return None
+        return list(islice(self._events, last_id - self._events[0].id + 1, None))
+
+    def _resume_cursor(self, last_event_id: str | None) -> int | None:
+        """Map a client's ``Last-Event-ID`` to a local cursor, or None when it cannot be replayed."""
+        if last_event_id is None:
+            return self._last_id
+        epoch, _, counter = last_event_id.rpartition(':')
+        if epoch != self.epoch or not counter.isdigit() or int(counter) > self._last_id:
+            return None
+        return int(counter)
+
+    def _resync(self) -> str:
+        return ServerSentEvent(event='resync', data='{}', id=f'{self.epoch}:{self._last_id}').encode()
+
+    async def subscribe(self, last_event_id: str | None = None, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """Yield encoded SSE frames, resuming after ``last_event_id`` when it is still in the history."""
+        cursor = self._resume_cursor(last_event_id)
+        if cursor is None:
+            cursor = self._last_id
+            yield self._resync()
+        while True:
+            changed = self._changed
+            events = self.since(cursor)
+            if events is None:
+                # The client is too far behind to replay; tell it to refetch everything.
+                cursor = self._last_id
+                yield self._resync()
+                continue
+            for event in events:
+                cursor = event.id
+                yield event.to_sse(self.epoch).encode()
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+
+
+_brokers: dict[str, EntryEventBroker] = {}
+
+
+def get_broker(tenant: str) -> EntryEventBroker:
+    broker = _brokers.get(tenant)
+    if broker is None:
+        broker = _brokers[tenant] = EntryEventBroker(history=settings.entries_stream_history)
+    return broker
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import html
+import json
+import logging
+import time
+from functools import lru_cache
 from typing import Any
 
 import httpx
+from fastapi import HTTPException, Request, status
 
-from app.core.config import settings
+from app.core.config import SanityTenant, settings
+from app.core.rate_limit import TokenBucket
+from app.services.cache import CacheBackend, decode_value, encode_value, get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+ENTRY_PROJECTION = (
+    "{ _id, title, subtitle, \"slug\": slug.current, \"category\": category->slug.current,"
+    " summary, body, publishedAt, _createdAt, _updatedAt, _rev }"
+)
 
 
 def _render_marks(text: str, marks: list[str] | None, mark_defs: dict[str, dict[str, Any]]) -> str:
@@ -124,90 +140,237 @@ def portable_text_to_html(blocks: list[dict[str, Any]] | None) -> str:
     return ''.join(html_parts)
 
 
-async def fetch_entries(category: str | None = None) -> list[dict[str, Any]]:
+class _RateLimiter:
+    """Delays outbound queries once a tenant exceeds its request budget."""
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._bucket = TokenBucket(self.burst, time.monotonic())
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            wait = self._bucket.consume(self.rate, self.burst, time.monotonic())
+            if wait > 0:
+                # Holding the lock while sleeping keeps waiters in FIFO order.
+                await asyncio.sleep(wait)
+                self._bucket.consume(self.rate, self.burst, time.monotonic())
+
+
+class SanityClient:
+    """Pooled HTTP client, rate limiter and response cache namespace scoped to one Sanity tenant."""
+
+    def __init__(
+        self,
+        tenant: SanityTenant,
+        cache: CacheBackend | None = None,
+        cache_ttl: float = 0.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.tenant = tenant
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.transport = transport
+        self._http: httpx.AsyncClient | None = None
+        self._limiter = _RateLimiter(tenant.rate_limit_per_second)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            headers: dict[str, str] = {}
+            if self.tenant.token:
+                headers['Authorization'] = f'Bearer {self.tenant.token}'
+            limits = httpx.Limits(
+                max_connections=self.tenant.max_connections,
+                max_keepalive_connections=self.tenant.max_connections,
+            )
+            self._http = httpx.AsyncClient(timeout=10.0, headers=headers, limits=limits, transport=self.transport)
+        return self._http
+
+    async def query(self, query: str, params: dict[str, Any] | None = None, live: bool = False) -> Any:
+        """Run a GROQ query. ``live`` bypasses the Sanity CDN for reads that must see the latest mutation."""
+        query_params = {'query': query}
+        if params:
+            query_params.update(params)
+
+        url = self.tenant.live_dataset_url if live else self.tenant.dataset_url
+        await self._limiter.acquire()
+        response = await self.http.get(url, params=query_params)
+        response.raise_for_status()
+        payload = response.json()
+        return payload.get('result') if isinstance(payload, dict) else None
+
+    # Cache failures are logged and treated as misses so a backend outage never fails a request.
+
+    async def cache_generation(self) -> str | None:
+        """Current cache generation; read it before querying and pass it back to ``set_cached``."""
+        if self.cache is None:
+            return None
+        try:
+            return await self.cache.generation(self.tenant.cache_namespace)
+        except Exception:
+            logger.exception("Cache backend failed reading the generation for %s", self.tenant.name)
+            return None
+
+    async def get_cached(self, generation: str | None, key: str) -> Any | None:
+        if self.cache is None or generation is None:
+            return None
+        try:
+            data = await self.cache.get(self.tenant.cache_namespace, generation, key)
+            return decode_value(data) if data is not None else None
+        except Exception:
+            # A backend outage or a corrupt entry is just a miss; the caller refetches and overwrites it.
+            logger.exception("Cache backend failed reading %s for %s", key, self.tenant.name)
+            return None
+
+    async def set_cached(self, generation: str | None, key: str, value: Any) -> None:
+        if self.cache is None or generation is None:
+            return
+        data = encode_value(value, settings.cache_compress_min_bytes)
+        try:
+            await self.cache.set(self.tenant.cache_namespace, generation, key, data, self.cache_ttl)
+        except Exception:
+            logger.exception("Cache backend failed writing %s for %s", key, self.tenant.name)
+
+    async def invalidate_cache(self, version: str | None = None) -> None:
+        """
+        Start a new cache generation. Workers passing the same ``version`` for the same change
+        share one generation instead of each emptying the cache again.
+        """
+        if self.cache is None:
+            return
+        generation = hashlib.sha1(version.encode()).hexdigest()[:16] if version else None
+        try:
+            await self.cache.invalidate(self.tenant.cache_namespace, generation)
+        except Exception:
+            logger.exception("Cache backend failed invalidating %s", self.tenant.name)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+_clients: dict[str, SanityClient] = {}
+
+
+@lru_cache()
+def get_tenants() -> dict[str, SanityTenant]:
+    return settings.sanity_tenant_configs
+
+
+@lru_cache()
+def _tenants_by_host() -> dict[str, SanityTenant]:
+    return {host.lower(): tenant for tenant in get_tenants().values() for host in tenant.hosts}
+
+
+def resolve_tenant(dataset: str | None = None, host: str | None = None) -> SanityTenant | None:
+    """
+    Pick the tenant for a request: an explicit dataset header wins, then the request host,
+    then the default dataset. Returns None when an explicitly requested dataset is unknown.
+    """
+    tenants = get_tenants()
+    if dataset:
+        return tenants.get(dataset)
+    if host:
+        tenant = _tenants_by_host().get(host.split(':', 1)[0].lower())
+        if tenant is not None:
+            return tenant
+    return tenants[settings.sanity_default_tenant]
+
+
+def get_client(tenant: str | None = None) -> SanityClient:
+    name = tenant or settings.sanity_default_tenant
+    client = _clients.get(name)
+    if client is None:
+        config = get_tenants().get(name)
+        if config is None:
+            raise KeyError(f'Unknown Sanity tenant: {name}')
+        client = SanityClient(config, cache=get_cache_backend(), cache_ttl=settings.sanity_cache_ttl_seconds)
+        _clients[name] = client
+    return client
+
+
+async def close_clients() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+async def get_sanity_client(request: Request) -> SanityClient:
+    tenant = resolve_tenant(
+        dataset=request.headers.get(settings.sanity_tenant_header),
+        host=request.headers.get('host'),
+    )
+    if tenant is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown dataset")
+    return get_client(tenant.name)
+
+
+def serialize_entry(item: dict[str, Any]) -> dict[str, Any]:
+    return {
+        'id': item.get('_id'),
+        'title': item.get('title'),
+        'subtitle': item.get('subtitle'),
+        'slug': item.get('slug'),
+        'category': item.get('category'),
+        'summary': item.get('summary'),
+        'content_html': portable_text_to_html(item.get('body')),
+        'created_at': item.get('_createdAt'),
+        'updated_at': item.get('_updatedAt'),
+        'published_at': item.get('publishedAt'),
+        'rev': item.get('_rev'),
+    }
+
+
+async def fetch_entries(category: str | None = None, client: SanityClient | None = None) -> list[dict[str, Any]]:
+    client = client or get_client()
+    cache_key = f'entries:{category or ""}'
+    generation = await client.cache_generation()
+    cached = await client.get_cached(generation, cache_key)
+    if cached is not None:
+        return cached
+
     filters = ['_type == "novarchEntry"', 'status == "published"']
     params: dict[str, Any] = {}
     if category:
         filters.append('category->slug.current == $category')
-        params['$category'] = category
+        params['$category'] = json.dumps(category)
 
     filter_expression = ' && '.join(filters)
-    query = (
-        f"*[{filter_expression}] | order(publishedAt desc){{"
-        " _id, title, subtitle, \"slug\": slug.current, \"category\": category->slug.current,"
-        " summary, body, publishedAt, _createdAt, _updatedAt }"
-    )
-
-    query_params = {'query': query}
-    query_params.update(params)
-
-    headers: dict[str, str] = {}
-    if settings.sanity_token:
-        headers['Authorization'] = f'Bearer {settings.sanity_token}'
-
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(settings.sanity_dataset_url, params=query_params, headers=headers)
-        response.raise_for_status()
-        payload = response.json()
-
-    results = payload.get('result', []) if isinstance(payload, dict) else []
-
-    entries: list[dict[str, Any]] = []
-    for item in results:
-        entry = {
-            'id': item.get('_id'),
-            'title': item.get('title'),
-            'subtitle': item.get('subtitle'),
-            'slug': item.get('slug'),
-            'category': item.get('category'),
-            'summary': item.get('summary'),
-            'content_html': portable_text_to_html(item.get('body')),
-            'created_at': item.get('_createdAt'),
-            'updated_at': item.get('_updatedAt'),
-            'published_at': item.get('publishedAt'),
-        }
-        entries.append(entry)
+    query = f"*[{filter_expression}] | order(publishedAt desc){ENTRY_PROJECTION}"
 
+    results = await client.query(query, params)
+    entries = [serialize_entry(item) for item in results or []]
+    # Unknown categories come back empty; caching them would let arbitrary ?category= values grow the cache.
+    if entries or not category:
+        await client.set_cached(generation, cache_key, entries)
     return entries
 
 
-async def fetch_entry_by_slug(slug: str) -> dict[str, Any] | None:
+async def fetch_entry_by_slug(slug: str, client: SanityClient | None = None) -> dict[str, Any] | None:
+    client = client or get_client()
+    cache_key = f'entry:{slug}'
+    generation = await client.cache_generation()
+    cached = await client.get_cached(generation, cache_key)
+    if cached is not None:
+        return cached
+
     filters = [
         '_type == "novarchEntry"',
         'status == "published"',
         'slug.current == $slug',
     ]
     filter_expression = ' && '.join(filters)
-    query = (
-        f"*[{filter_expression}][0]{{"
-        " _id, title, subtitle, \"slug\": slug.current, \"category\": category->slug.current,"
-        " summary, body, publishedAt, _createdAt, _updatedAt }"
-    )
+    query = f"*[{filter_expression}][0]{ENTRY_PROJECTION}"
 
-    query_params = {'query': query, '$slug': slug}
-
-    headers: dict[str, str] = {}
-    if settings.sanity_token:
-        headers['Authorization'] = f'Bearer {settings.sanity_token}'
-
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(settings.sanity_dataset_url, params=query_params, headers=headers)
-        response.raise_for_status()
-        payload = response.json()
-
-    result = payload.get('result') if isinstance(payload, dict) else None
+    result = await client.query(query, {'$slug': json.dumps(slug)})
     if not result:
         return None
 
-    return {
-        'id': result.get('_id'),
-        'title': result.get('title'),
-        'subtitle': result.get('subtitle'),
-        'slug': result.get('slug'),
-        'category': result.get('category'),
-        'summary': result.get('summary'),
-        'content_html': portable_text_to_html(result.get('body')),
-        'created_at': result.get('_createdAt'),
-        'updated_at': result.get('_updatedAt'),
-        'published_at': result.get('publishedAt'),
-    }
+    entry = serialize_entry(result)
+    await client.set_cached(generation, cache_key, entry)
+    return entry
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.services.entry_events import EntryEventBroker, get_broker
+from app.services.sanity import ENTRY_PROJECTION, SanityClient, get_client, get_tenants, serialize_entry
+from app.services.sse import iter_events
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_FILTER = '_type == "novarchEntry" && status == "published"'
+LISTEN_QUERY = '*[_type == "novarchEntry"]'
+
+
+class EntryIndex:
+    """In-memory slug and category lookups over the published entries of one dataset."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._by_id: dict[str, dict[str, Any]] = {}
+        self._by_slug: dict[str, dict[str, Any]] = {}
+        self._sorted: dict[str | None, list[dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def load(self, entries: list[dict[str, Any]]) -> list[tuple[str, dict[str, Any]]]:
+        """Replace the index contents, returning the changes relative to the previous load."""
+        previous = self._by_id
+        self._by_id = {entry['id']: entry for entry in entries}
+        self._by_slug = {entry['slug']: entry for entry in entries if entry.get('slug')}
+        self._sorted.clear()
+
+        changes: list[tuple[str, dict[str, Any]]] = []
+        if self.ready:
+            for document_id, entry in self._by_id.items():
+                old = previous.get(document_id)
+                if old is None:
+                    changes.append(('created', entry))
+                elif old.get('rev') != entry.get('rev'):
+                    changes.append(('updated', entry))
+            changes.extend(('deleted', entry) for document_id, entry in previous.items() if document_id not in self._by_id)
+        self.ready = True
+        return changes
+
+    def upsert(self, entry: dict[str, Any]) -> str | None:
+        """Insert or replace an entry, returning ``created``/``updated``, or None when its revision is unchanged."""
+        previous = self._by_id.get(entry['id'])
+        if previous is not None and previous.get('rev') == entry.get('rev'):
+            return None
+        if previous is not None and self._by_slug.get(previous.get('slug')) is previous:
+            del self._by_slug[previous['slug']]
+        self._by_id[entry['id']] = entry
+        if entry.get('slug'):
+            self._by_slug[entry['slug']] = entry
+        self._sorted.clear()
+        return 'created' if previous is None else 'updated'
+
+    def remove(self, document_id: str) -> dict[str, Any] | None:
+        entry = self._by_id.pop(document_id, None)
+        if entry is None:
+            return None
+        if self._by_slug.get(entry.get('slug')) is entry:
+            del self._by_slug[entry['slug']]
+        self._sorted.clear()
+        return entry
+
+    def get(self, slug: str) -> dict[str, Any] | None:
+        return self._by_slug.get(slug)
+
+    def list_entries(self, category: str | None = None) -> list[dict[str, Any]]:
+        entries = self._sorted.get(category)
+        if entries is None:
+            candidates = self._by_id.values()
+            if category:
+                candidates = [entry for entry in candidates if entry.get('category') == category]
+            # Mirrors `order(publishedAt desc)`: ISO timestamps sort lexically, unpublished dates last.
+            entries = sorted(candidates, key=lambda entry: entry.get('published_at') or '', reverse=True)
+            self._sorted[category] = entries
+        return entries
+
+
+class SanityListener:
+    """
+    Keeps an EntryIndex in sync with Sanity: bulk-loads published entries once the listen
+    stream is open, then re-fetches each mutated document. Every reconnect reloads the index,
+    since a resumed stream is not guaranteed to replay everything missed; if the stream stays
+    down for ``stale_after`` seconds the index is marked not ready so handlers query Sanity.
+    """
+
+    def __init__(
+        self,
+        client: SanityClient,
+        index: EntryIndex,
+        broker: EntryEventBroker | None = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        stale_after: float = 10.0,
+    ) -> None:
+        self.client = client
+        self.index = index
+        self.broker = broker
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.stale_after = stale_after
+        self.last_event_id: str | None = None
+        self._received_event = False
+
+    async def run(self) -> None:
+        delay = self.reconnect_delay
+        disconnected_at: float | None = None
+        while True:
+            self._received_event = False
+            try:
+                if await self.listen():
+                    return
+            except asyncio.CancelledError:
+                raise
+            except (httpx.HTTPError, ValueError) as exc:
+                logger.warning("Sanity listener for %s failed: %s", self.client.tenant.name, exc)
+            except Exception:  # e.g. a shared cache backend outage; keep the index alive
+                logger.exception("Sanity listener for %s failed", self.client.tenant.name)
+
+            if self._received_event or disconnected_at is None:
+                # The stream was healthy until now: restart the backoff and the staleness clock.
+                delay = self.reconnect_delay
+                disconnected_at = time.monotonic()
+            if self.index.ready and time.monotonic() - disconnected_at >= self.stale_after:
+                logger.warning("Sanity listener for %s is down; serving from Sanity directly", self.client.tenant.name)
+                self.index.ready = False
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def listen(self) -> bool:
+        """Consume one listen connection. Returns True when Sanity asks the client to stop."""
+        headers = {'Accept': 'text/event-stream'}
+        if self.last_event_id:
+            headers['Last-Event-ID'] = self.last_event_id
+        params = {'query': LISTEN_QUERY, 'includeResult': 'false', 'visibility': 'query'}
+        timeout = httpx.Timeout(10.0, read=settings.sanity_listen_idle_timeout_seconds)
+
+        async with self.client.http.stream(
+            'GET', self.client.tenant.listen_url, params=params, headers=headers, timeout=timeout
+        ) as response:
+            response.raise_for_status()
+            async for event in iter_events(response.aiter_lines()):
+                self._received_event = True
+                if event.event == 'welcome':
+                    # Each welcome follows a gap (or is the first connection), so rebuild; the
+                    # reload diffs against the current index and only publishes real changes.
+                    await self.reload()
+                elif event.event == 'mutation':
+                    await self.apply_mutation(json.loads(event.data))
+                elif event.event == 'channelError':
+                    raise ValueError(f'Sanity channel error: {event.data}')
+                elif event.event == 'disconnect':
+                    logger.warning("Sanity closed the listener for %s: %s", self.client.tenant.name, event.data)
+                    # No further mutations will arrive, so send handlers back to querying Sanity.
+                    self.index.ready = False
+                    return True
+                if event.id:
+                    self.last_event_id = event.id
+        return False
+
+    async def reload(self) -> None:
+        query = f"*[{PUBLISHED_FILTER}]{ENTRY_PROJECTION}"
+        results = await self.client.query(query, live=True)
+        entries = [serialize_entry(item) for item in results or []]
+        changes = self.index.load(entries)
+        if not changes:
+            # The initial load (or a reload that found nothing new) must not wipe a shared cache.
+            return
+        # Every worker reloading the same content derives the same version, so they share one new generation.
+        version = ','.join(sorted(f"{entry['id']}@{entry.get('rev')}" for entry in entries))
+        await self.client.invalidate_cache(version)
+        for change, entry in changes:
+            self._publish(change, entry.get('slug'), entry.get('rev'))
+
+    async def apply_mutation(self, mutation: dict[str, Any]) -> None:
+        document_id = mutation.get('documentId')
+        if not document_id or document_id.startswith('drafts.'):
+            return
+
+        result = None
+        if mutation.get('transition') != 'disappear':
+            query = f"*[_id == $id && {PUBLISHED_FILTER}][0]{ENTRY_PROJECTION}"
+            result = await self.client.query(query, {'$id': json.dumps(document_id)}, live=True)
+
+        # Every worker sees the same transaction, so they all move to the same cache generation.
+        version = mutation.get('transactionId') or mutation.get('resultRev')
+        if result:
+            entry = serialize_entry(result)
+            change = self.index.upsert(entry)
+            if change is not None:
+                await self.client.invalidate_cache(version)
+                self._publish(change, entry.get('slug'), entry.get('rev'))
+        else:
+            removed = self.index.remove(document_id)
+            if removed is not None:
+                await self.client.invalidate_cache(version)
+                self._publish('deleted', removed.get('slug'), mutation.get('resultRev') or removed.get('rev'))
+
+    def _publish(self, change: str, slug: str | None, rev: str | None) -> None:
+        if self.broker is not None:
+            self.broker.publish(change, slug, rev)
+
+
+_indexes: dict[str, EntryIndex] = {}
+_tasks: list[asyncio.Task[None]] = []
+
+
+def get_entry_index(tenant: str) -> EntryIndex | None:
+    """Return the tenant's index once its initial load has completed."""
+    index = _indexes.get(tenant)
+    if index is None or not index.ready:
+        return None
+    return index
+
+
+def start_live_indexes() -> None:
+    for name in get_tenants():
+        index = _indexes.setdefault(name, EntryIndex())
+        listener = SanityListener(
+            get_client(name),
+            index,
+            broker=get_broker(name),
+            stale_after=settings.sanity_listen_stale_after_seconds,
+        )
+        _tasks.append(asyncio.create_task(listener.run(), name=f"sanity-listener:{name}"))
+
+
+async def stop_live_indexes() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    _indexes.clear()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+
+@dataclass
+class ServerSentEvent:
+    event: str = "message"
+    data: str = ""
+    id: str | None = None
+    retry: int | None = None
+
+    def encode(self) -> str:
+        lines: list[str] = []
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        if self.event != "message":
+            lines.append(f"event: {self.event}")
+        if self.retry is not None:
+            lines.append(f"retry: {self.retry}")
+        lines.extend(f"data: {line}" for line in self.data.split("\n"))
+        return "\n".join(lines) + "\n\n"
+
+
+async def iter_events(lines: AsyncIterator[str]) -> AsyncIterator[ServerSentEvent]:
+    """Parse a text/event-stream body, yielding one event per blank-line-terminated block."""
+    event: str | None = None
+    data: list[str] = []
+    event_id: str | None = None
+    retry: int | None = None
+
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            if data or event is not None:
+                yield ServerSentEvent(event=event or "message", data="\n".join(data), id=event_id, retry=retry)
+            event, data, event_id, retry = None, [], None, None
+            continue
+        if line.startswith(":"):
+            continue
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+        elif field == "id":
+            event_id = value
+        elif field == "retry" and value.isdigit():
+            retry = int(value)
+
+    if data:
+        yield ServerSentEvent(event=event or "message", data="\n".join(data), id=event_id, retry=retry)
@@ -7,8 +7,8 @@ import uuid
 from sqlalchemy import select
 
 from app.core.config import settings
-from app.db.session import AsyncSessionLocal
-from app.models.user import User
+from app.db.base import User
+from app.db.session import get_sessionmaker
 from app.services.security import get_password_hash
 
 
@@ -17,7 +17,12 @@ async def create_superuser():
     full_name = input("Full name (optional): ").strip() or None
     password = input("Password: ").strip()
 
-    async with AsyncSessionLocal() as session:
+    session_factory = get_sessionmaker()
+    if session_factory is None:
+        print("DATABASE_URL is not configured")
+        return
+
+    async with session_factory() as session:
         result = await session.execute(select(User).where(User.email == email))
         existing = result.scalars().first()
         if existing:
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.core.config import SanityTenant, settings
+from app.services.cache import (
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    decode_value,
+    encode_value,
+    get_cache_backend,
+)
+from app.services.sanity import SanityClient, fetch_entries
+
+NAMESPACE = "p:d:test"
+TENANT = SanityTenant(name="test", project_id="p", dataset="d", api_version="2023-05-03", api_host="http://sanity.test")
+
+
+class RedisStandIn:
+    """Async get/set over a dict, honouring ``ex`` like Redis."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, tuple[float | None, bytes | str]] = {}
+
+    async def get(self, key: str) -> bytes | str | None:
+        item = self.values.get(key)
+        if item is None or (item[0] is not None and item[0] <= time.monotonic()):
+            return None
+        return item[1]
+
+    async def set(self, key: str, value: bytes | str, ex: int | None = None) -> None:
+        self.values[key] = (time.monotonic() + ex if ex else None, value)
+
+
+@pytest.fixture(params=["memory", "disk", "redis"])
+def backend(request, tmp_path: Path):
+    if request.param == "memory":
+        return MemoryCacheBackend()
+    if request.param == "disk":
+        return DiskCacheBackend(tmp_path)
+    return RedisCacheBackend(RedisStandIn(), generation_ttl=0)
+
+
+def test_encode_decode_round_trip():
+    small = {"slug": "a"}
+    large = {"body": "x" * 4096}
+
+    assert encode_value(small).startswith(b"j")
+    assert encode_value(large).startswith(b"z")
+    assert decode_value(encode_value(small)) == small
+    assert decode_value(encode_value(large)) == large
+
+
+def test_values_are_pinned_to_their_generation(backend):
+    async def scenario() -> tuple[bytes | None, bytes | None, bool]:
+        generation = await backend.generation(NAMESPACE)
+        await backend.set(NAMESPACE, generation, "key", b"old", ttl=60)
+        before = await backend.get(NAMESPACE, generation, "key")
+        await backend.invalidate(NAMESPACE)
+        current = await backend.generation(NAMESPACE)
+        return before, await backend.get(NAMESPACE, current, "key"), current != generation
+
+    before, after, moved = asyncio.run(scenario())
+    assert before == b"old"
+    assert after is None
+    assert moved
+
+
+def test_set_under_a_stale_generation_is_dropped(backend):
+    async def scenario() -> bytes | None:
+        stale = await backend.generation(NAMESPACE)
+        # The value was computed before another worker invalidated the namespace.
+        await backend.invalidate(NAMESPACE)
+        await backend.set(NAMESPACE, stale, "key", b"stale", ttl=60)
+        return await backend.get(NAMESPACE, await backend.generation(NAMESPACE), "key")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_invalidate_with_the_same_generation_is_idempotent(backend):
+    async def scenario() -> bytes | None:
+        await backend.invalidate(NAMESPACE, "v1")
+        await backend.set(NAMESPACE, "v1", "key", b"value", ttl=60)
+        # A second worker reacting to the same change must not empty the cache again.
+        await backend.invalidate(NAMESPACE, "v1")
+        return await backend.get(NAMESPACE, await backend.generation(NAMESPACE), "key")
+
+    assert asyncio.run(scenario()) == b"value"
+
+
+def test_disk_sweep_drops_expired_then_oldest_entries(tmp_path: Path):
+    backend = DiskCacheBackend(tmp_path, max_entries=3, sweep_every=1000)
+
+    async def scenario() -> None:
+        generation = await backend.generation(NAMESPACE)
+        await backend.set(NAMESPACE, generation, "expired", b"x", ttl=-1)
+        for index in range(5):
+            await backend.set(NAMESPACE, generation, f"key-{index}", b"x", ttl=60)
+            path = backend._path(NAMESPACE, generation, f"key-{index}")
+            os.utime(path, (index, index))
+        backend._sweep(backend._path(NAMESPACE, generation, "key-0").parent)
+
+    asyncio.run(scenario())
+    keys = ["expired", *(f"key-{index}" for index in range(5))]
+    kept = [key for key in keys if backend._path(NAMESPACE, "0", key).exists()]
+    assert kept == ["key-2", "key-3", "key-4"]
+
+
+def test_disk_set_sweeps_every_n_writes(tmp_path: Path):
+    backend = DiskCacheBackend(tmp_path, max_entries=2, sweep_every=4)
+
+    async def scenario() -> None:
+        for index in range(4):
+            await backend.set(NAMESPACE, "0", f"key-{index}", b"x", ttl=60)
+
+    asyncio.run(scenario())
+    assert len(list(backend._path(NAMESPACE, "0", "key-0").parent.iterdir())) == 2
+
+
+def test_unknown_cache_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "sanity_cache_ttl_seconds", 60.0)
+    monkeypatch.setattr(settings, "cache_backend", "memcached")
+    get_cache_backend.cache_clear()
+    try:
+        with pytest.raises(RuntimeError, match="memcached"):
+            get_cache_backend()
+    finally:
+        get_cache_backend.cache_clear()
+
+
+def test_corrupt_cache_entry_is_treated_as_a_miss():
+    backend = MemoryCacheBackend()
+    queries: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        queries.append(request)
+        return httpx.Response(200, json={"result": [{"_id": "a", "_rev": "r1", "slug": "first", "body": []}]})
+
+    client = SanityClient(TENANT, cache=backend, cache_ttl=60, transport=httpx.MockTransport(handler))
+
+    async def scenario() -> list[dict]:
+        await fetch_entries(None, client)
+        for namespace, entry_generation, key in list(backend._entries):
+            await backend.set(namespace, entry_generation, key, b"z-not-zlib", ttl=60)
+        return await fetch_entries(None, client)
+
+    entries = asyncio.run(scenario())
+    assert [entry["slug"] for entry in entries] == ["first"]
+    assert len(queries) == 2
+
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.entry_events import HEARTBEAT, EntryEventBroker
+
+
+async def take(broker: EntryEventBroker, last_event_id: str | None, count: int, heartbeat: float = 1.0) -> list[str]:
+    frames: list[str] = []
+    stream = broker.subscribe(last_event_id, heartbeat=heartbeat)
+    try:
+        while len(frames) < count:
+            frames.append(await asyncio.wait_for(stream.__anext__(), timeout=1))
+    finally:
+        await stream.aclose()
+    return frames
+
+
+def publish(broker: EntryEventBroker, count: int) -> None:
+    for number in range(count):
+        broker.publish("updated", f"entry-{number}", f"rev-{number}")
+
+
+def test_resume_replays_events_after_last_event_id():
+    broker = EntryEventBroker(history=10)
+    publish(broker, 3)
+
+    frames = asyncio.run(take(broker, f"{broker.epoch}:1", 2))
+
+    assert frames[0].startswith(f"id: {broker.epoch}:2\nevent: updated\n")
+    assert '"slug":"entry-1"' in frames[0]
+    assert '"_rev":"rev-2"' in frames[1]
+
+
+def test_live_subscriber_receives_new_events():
+    broker = EntryEventBroker()
+
+    async def scenario() -> list[str]:
+        consumer = asyncio.create_task(take(broker, None, 1))
+        await asyncio.sleep(0.01)
+        broker.publish("created", "fresh", "r1")
+        return await consumer
+
+    (frame,) = asyncio.run(scenario())
+    assert "event: created" in frame
+    assert '"slug":"fresh"' in frame
+
+
+def test_foreign_epoch_gets_resync():
+    broker = EntryEventBroker()
+    publish(broker, 2)
+
+    for last_event_id in ("other-epoch:1", "1", f"{broker.epoch}:99", f"{broker.epoch}:x"):
+        (frame,) = asyncio.run(take(broker, last_event_id, 1))
+        assert frame == f"id: {broker.epoch}:2\nevent: resync\ndata: {{}}\n\n"
+
+
+def test_evicted_id_gets_resync():
+    broker = EntryEventBroker(history=2)
+    publish(broker, 5)
+
+    (frame,) = asyncio.run(take(broker, f"{broker.epoch}:1", 1))
+    assert "event: resync" in frame
+
+
+def test_idle_stream_sends_heartbeats():
+    broker = EntryEventBroker()
+
+    frames = asyncio.run(take(broker, None, 2, heartbeat=0.01))
+    assert frames == [HEARTBEAT, HEARTBEAT]
+
+
+def test_stream_endpoint_unavailable_without_live_index(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.main import app
+
+    monkeypatch.setattr(settings, "sanity_live_index", False)
+    response = TestClient(app).get(f"{settings.api_v1_prefix}/entries/stream")
+    assert response.status_code == 503
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.rate_limit import (
+    MemoryRateLimitBackend,
+    RateLimitMiddleware,
+    RateLimitPolicy,
+    RateLimitRule,
+    RedisRateLimitBackend,
+    TokenBucket,
+)
+
+POLICY = RateLimitPolicy(name="public", rate=1.0, burst=2)
+RULES = [RateLimitRule(path_prefix="/api/v1/entries", policy=POLICY, methods=frozenset({"GET"}))]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def ok_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def http_scope(path: str = "/api/v1/entries/", client: str = "10.0.0.1", headers=()) -> dict:
+    return {"type": "http", "path": path, "method": "GET", "headers": list(headers), "client": (client, 1234)}
+
+
+def call(middleware: RateLimitMiddleware, scope: dict) -> tuple[int, dict[bytes, bytes], bytes]:
+    messages: list[dict] = []
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    asyncio.run(middleware(scope, None, send))
+    start, body = messages
+    return start["status"], dict(start["headers"]), body["body"]
+
+
+def test_token_bucket_refills_at_rate_up_to_burst():
+    bucket = TokenBucket(tokens=2, now=0.0)
+
+    assert bucket.consume(rate=1.0, burst=2, now=0.0) == 0.0
+    assert bucket.consume(rate=1.0, burst=2, now=0.0) == 0.0
+    assert bucket.consume(rate=1.0, burst=2, now=0.0) == pytest.approx(1.0)
+    assert bucket.consume(rate=1.0, burst=2, now=0.5) == pytest.approx(0.5)
+    assert bucket.consume(rate=1.0, burst=2, now=1.0) == 0.0
+    bucket.consume(rate=1.0, burst=2, now=100.0)
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_allowed_requests_carry_ratelimit_headers_and_excess_gets_429():
+    middleware = RateLimitMiddleware(ok_app, RULES, MemoryRateLimitBackend(clock=FakeClock()))
+
+    status, headers, _ = call(middleware, http_scope())
+    assert status == 200
+    assert headers[b"ratelimit-limit"] == b"2"
+    assert headers[b"ratelimit-remaining"] == b"1"
+
+    call(middleware, http_scope())
+    status, headers, body = call(middleware, http_scope())
+    assert status == 429
+    assert headers[b"retry-after"] == b"1"
+    assert headers[b"ratelimit-remaining"] == b"0"
+    assert headers[b"ratelimit-reset"] == b"2"
+    assert json.loads(body) == {"detail": "Too many requests"}
+
+
+def test_unmatched_routes_are_not_limited():
+    middleware = RateLimitMiddleware(ok_app, RULES, MemoryRateLimitBackend(clock=FakeClock()))
+
+    for _ in range(5):
+        status, headers, _ = call(middleware, http_scope(path="/health"))
+        assert status == 200
+        assert b"ratelimit-limit" not in headers
+
+
+def test_forwarded_hops_key_clients_from_the_right():
+    middleware = RateLimitMiddleware(ok_app, RULES, MemoryRateLimitBackend(clock=FakeClock()), forwarded_hops=1)
+
+    # A client rotating the spoofable left-hand entries still shares one bucket.
+    for spoofed in ("1.1.1.1", "2.2.2.2"):
+        call(middleware, http_scope(headers=[(b"x-forwarded-for", f"{spoofed}, 203.0.113.7".encode())]))
+    status, _, _ = call(middleware, http_scope(headers=[(b"x-forwarded-for", b"3.3.3.3, 203.0.113.7")]))
+    assert status == 429
+
+    status, _, _ = call(middleware, http_scope(headers=[(b"x-forwarded-for", b"1.1.1.1, 198.51.100.9")]))
+    assert status == 200
+
+
+def test_socket_address_is_used_without_forwarded_hops():
+    middleware = RateLimitMiddleware(ok_app, RULES, MemoryRateLimitBackend(clock=FakeClock()))
+    assert middleware._client_key(http_scope(headers=[(b"x-forwarded-for", b"1.1.1.1")])) == "10.0.0.1"
+
+
+def test_backend_failure_lets_requests_through():
+    class BrokenBackend:
+        async def hit(self, key, policy):
+            raise ConnectionError("redis is down")
+
+    status, headers, _ = call(RateLimitMiddleware(ok_app, RULES, BrokenBackend()), http_scope())
+    assert status == 200
+    assert b"ratelimit-limit" not in headers
+
+
+class RedisStandIn:
+    """Runs the token bucket script's logic in Python against a fake clock."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+        self.hashes: dict[str, dict[str, float]] = {}
+        self.calls: list[tuple] = []
+
+    async def eval(self, script: str, numkeys: int, key: str, rate: str, burst: str):
+        self.calls.append((numkeys, key, rate, burst))
+        rate_value, burst_value = float(rate), float(burst)
+        state = self.hashes.get(key, {})
+        now = self.clock()
+        tokens = state.get("tokens", burst_value)
+        tokens = min(burst_value, tokens + max(0.0, now - state.get("ts", now)) * rate_value)
+        allowed = 0
+        if tokens >= 1:
+            tokens -= 1
+            allowed = 1
+        self.hashes[key] = {"tokens": tokens, "ts": now}
+        return [allowed, str(tokens).encode()]
+
+
+def test_redis_backend_through_stand_in():
+    clock = FakeClock()
+    stand_in = RedisStandIn(clock)
+    middleware = RateLimitMiddleware(ok_app, RULES, RedisRateLimitBackend(stand_in))
+
+    assert [call(middleware, http_scope())[0] for _ in range(3)] == [200, 200, 429]
+    clock.now = 1.0
+    assert call(middleware, http_scope())[0] == 200
+    assert stand_in.calls[0] == (1, "ratelimit:public:10.0.0.1", "1.0", "2")
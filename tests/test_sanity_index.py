@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Callable
+
+import httpx
+
+from app.core.config import SanityTenant
+from app.services.entry_events import EntryEventBroker
+from app.services.sanity import SanityClient
+from app.services.sanity_index import EntryIndex, SanityListener
+
+TENANT = SanityTenant(name="test", project_id="p", dataset="d", api_version="2023-05-03", api_host="http://sanity.test")
+
+
+def document(document_id: str, slug: str, rev: str = "r1", category: str = "doctrine") -> dict:
+    return {
+        "_id": document_id,
+        "_rev": rev,
+        "title": slug.title(),
+        "slug": slug,
+        "category": category,
+        "body": [],
+        "publishedAt": "2024-01-01T00:00:00Z",
+    }
+
+
+def sse(*events: tuple[str, str | None, dict]) -> bytes:
+    frames = []
+    for name, event_id, data in events:
+        frame = f"event: {name}\n"
+        if event_id:
+            frame += f"id: {event_id}\n"
+        frames.append(frame + f"data: {json.dumps(data)}\n\n")
+    return "".join(frames).encode()
+
+
+class SanityStandIn:
+    """Serves queries from an in-memory dataset and listen connections from queued SSE bodies."""
+
+    def __init__(self, documents: list[dict], streams: list[bytes | Callable[[], httpx.Response]]) -> None:
+        self.documents = {doc["_id"]: doc for doc in documents}
+        self.streams = streams
+        self.listen_requests: list[httpx.Request] = []
+        self.queried_ids: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if "/data/listen/" in request.url.path:
+            self.listen_requests.append(request)
+            stream = self.streams.pop(0) if self.streams else b""
+            if callable(stream):
+                return stream()
+            return httpx.Response(200, content=stream, headers={"Content-Type": "text/event-stream"})
+
+        raw_id = request.url.params.get("$id")
+        if raw_id is None:
+            return httpx.Response(200, json={"result": list(self.documents.values())})
+        document_id = json.loads(raw_id)
+        self.queried_ids.append(document_id)
+        return httpx.Response(200, json={"result": self.documents.get(document_id)})
+
+
+def make_listener(stand_in: SanityStandIn, **kwargs) -> tuple[SanityListener, EntryIndex, EntryEventBroker]:
+    index = EntryIndex()
+    broker = EntryEventBroker()
+    client = SanityClient(TENANT, transport=httpx.MockTransport(stand_in))
+    return SanityListener(client, index, broker=broker, **kwargs), index, broker
+
+
+def test_welcome_bulk_loads_published_entries():
+    stand_in = SanityStandIn([document("a", "first"), document("b", "second")], [sse(("welcome", None, {}))])
+    listener, index, _ = make_listener(stand_in)
+
+    assert asyncio.run(listener.listen()) is False
+    assert index.ready
+    assert index.get("first")["id"] == "a"
+    assert [entry["slug"] for entry in index.list_entries("doctrine")] == ["first", "second"]
+
+
+def test_mutations_update_and_remove_entries():
+    stand_in = SanityStandIn([document("a", "first")], [])
+    listener, index, broker = make_listener(stand_in)
+
+    async def scenario() -> None:
+        await listener.reload()
+        stand_in.documents["a"] = document("a", "renamed", rev="r2")
+        await listener.apply_mutation({"documentId": "a", "transition": "update", "transactionId": "t1"})
+        await listener.apply_mutation({"documentId": "a", "transition": "disappear", "resultRev": "r3"})
+
+    asyncio.run(scenario())
+    assert index.get("first") is None
+    assert index.get("renamed") is None
+    assert [(event.type, event.slug, event.rev) for event in broker.since(0)] == [
+        ("updated", "renamed", "r2"),
+        ("deleted", "renamed", "r3"),
+    ]
+    assert stand_in.queried_ids == ["a"]
+
+
+def test_draft_mutations_are_ignored():
+    stand_in = SanityStandIn([document("a", "first")], [])
+    listener, index, broker = make_listener(stand_in)
+
+    async def scenario() -> None:
+        await listener.reload()
+        await listener.apply_mutation({"documentId": "drafts.a", "transition": "update"})
+
+    asyncio.run(scenario())
+    assert stand_in.queried_ids == []
+    assert broker.since(0) == []
+
+
+def test_reconnect_sends_last_event_id_and_reloads():
+    stand_in = SanityStandIn(
+        [document("a", "first")],
+        [
+            sse(("welcome", "evt-1", {}), ("mutation", "evt-2", {"documentId": "a", "transition": "update"})),
+            sse(("welcome", None, {}), ("disconnect", None, {"reason": "done"})),
+        ],
+    )
+    listener, index, broker = make_listener(stand_in, reconnect_delay=0.01)
+
+    async def scenario() -> None:
+        original_reload = listener.reload
+
+        async def reload() -> None:
+            # The document changes while the stream is down; the reconnect must pick it up.
+            if len(stand_in.listen_requests) == 2:
+                stand_in.documents["a"] = document("a", "first", rev="r2")
+            await original_reload()
+
+        listener.reload = reload
+        await asyncio.wait_for(listener.run(), timeout=1)
+
+    asyncio.run(scenario())
+    assert "last-event-id" not in stand_in.listen_requests[0].headers
+    assert stand_in.listen_requests[1].headers["last-event-id"] == "evt-2"
+    assert [(event.type, event.rev) for event in broker.since(0)] == [("updated", "r2")]
+
+
+def test_disconnect_stops_listener_and_marks_index_not_ready():
+    stand_in = SanityStandIn(
+        [document("a", "first")],
+        [sse(("welcome", None, {}), ("disconnect", None, {"reason": "forbidden"}))],
+    )
+    listener, index, _ = make_listener(stand_in, reconnect_delay=0.01)
+
+    asyncio.run(asyncio.wait_for(listener.run(), timeout=1))
+    assert not index.ready
+    assert len(stand_in.listen_requests) == 1
+
+
+def test_clean_stream_end_backs_off_before_reconnecting():
+    stand_in = SanityStandIn([], [])
+    listener, _, _ = make_listener(stand_in, reconnect_delay=0.05, max_reconnect_delay=1.0)
+
+    async def scenario() -> None:
+        task = asyncio.create_task(listener.run())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    # 0.05 + 0.1 seconds of backoff fit into the window, so at most three connections.
+    assert 1 <= len(stand_in.listen_requests) <= 3
+
+
+def test_failing_stream_marks_index_not_ready_after_grace_period():
+    failure = lambda: httpx.Response(503)  # noqa: E731
+    stand_in = SanityStandIn([document("a", "first")], [sse(("welcome", None, {}))] + [failure] * 20)
+    listener, index, _ = make_listener(stand_in, reconnect_delay=0.01, max_reconnect_delay=0.01, stale_after=0.05)
+
+    async def scenario() -> None:
+        task = asyncio.create_task(listener.run())
+        await asyncio.sleep(0.02)
+        assert index.ready
+        await asyncio.sleep(0.15)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert not index.ready